@@ -200,6 +200,46 @@ class ConfigParser:
                 self.pos += 1
             return self.text[start : self.pos].strip()
 
+    def read_directive_value(self) -> str:
+        """Read the (possibly space-separated) values of a directive"""
+        values = []
+
+        # Read first value
+        value = self.read_value()
+        if value:
+            values.append(value)
+
+        # Check for additional values (space-separated)
+        while True:
+            self.skip_whitespace()
+            if self.peek() in ";{}" or not self.peek():
+                break
+
+            additional_value = self.read_value()
+            if additional_value:
+                values.append(additional_value)
+            else:
+                break
+
+        self.skip_whitespace()
+
+        # Consume semicolon if present
+        if self.peek() == ";":
+            self.consume()
+
+        return " ".join(values) if len(values) > 1 else (values[0] if values else "")
+
+    @staticmethod
+    def store_directive(result: Dict[str, Any], directive: str, value: Any):
+        """Store a directive, collecting repeated directives into a list"""
+        if directive in result:
+            if isinstance(result[directive], list):
+                result[directive].append(value)
+            else:
+                result[directive] = [result[directive], value]
+        else:
+            result[directive] = value
+
     def parse_block(self) -> Dict[str, Any]:
         """Parse a configuration block recursively"""
         result = {}
@@ -227,56 +267,14 @@ class ConfigParser:
                     self.consume()  # consume '}'
 
                 # Handle multiple blocks with same name
-                if directive in result:
-                    if isinstance(result[directive], list):
-                        result[directive].append(block_content)
-                    else:
-                        result[directive] = [result[directive], block_content]
-                else:
-                    result[directive] = block_content
+                self.store_directive(result, directive, block_content)
 
             else:
                 # It's a value directive - may have multiple values
-                values = []
-
-                # Read first value
-                value = self.read_value()
-                if value:
-                    values.append(value)
-
-                # Check for additional values (space-separated)
-                while True:
-                    self.skip_whitespace()
-                    if self.peek() in ";{}" or not self.peek():
-                        break
-
-                    additional_value = self.read_value()
-                    if additional_value:
-                        values.append(additional_value)
-                    else:
-                        break
-
-                self.skip_whitespace()
-
-                # Consume semicolon if present
-                if self.peek() == ";":
-                    self.consume()
-
-                # Store the values
-                final_value = (
-                    " ".join(values)
-                    if len(values) > 1
-                    else (values[0] if values else "")
-                )
+                final_value = self.read_directive_value()
 
                 # Handle multiple directives with same name
-                if directive in result:
-                    if isinstance(result[directive], list):
-                        result[directive].append(final_value)
-                    else:
-                        result[directive] = [result[directive], final_value]
-                else:
-                    result[directive] = final_value
+                self.store_directive(result, directive, final_value)
 
         return result
 
@@ -0,0 +1,604 @@
+#!/usr/bin/env python3
+"""
+Differential Fuzzing and Performance Gate
+=========================================
+
+Speed work on ``ConfigParser``, ``parse_config`` and their helpers must not
+change what they return. This script guards that in two ways.
+
+``fuzz``: a seeded differential fuzzer. Each optimised mode is run side by
+side with the untouched originals in ``reference.py`` on generated configs
+and on randomly mutated copies of them. Any disagreement (in the parsed tree
+or in the error raised) is shrunk to a minimal input and reported:
+
+    python fuzz.py fuzz --seed 7 --iterations 2000
+
+``perf``: a speed regression gate. Every parser is timed on a standard
+corpus together with its reference, so the result is a speed-up that does
+not depend on how fast the machine is, and compared against a stored
+baseline; a fractional drop in speed-up of more than ``--threshold`` fails
+the run. Raw throughput (characters per second) is only gated when
+``--raw-threshold`` is given, and only means something when the baseline
+was recorded on the same machine:
+
+    python fuzz.py perf --update-baseline     # record on a known good tree
+    python fuzz.py perf --threshold 0.15      # later, after a change
+    python fuzz.py perf --raw-threshold 0.3   # same machine, also gate chars/s
+
+Both exit non-zero on failure, so they can sit in CI. ``all`` runs both.
+
+Changes made on purpose are not reported. The single-pass ``parse_value``
+now reads hex and exponent numbers, and quoted array elements may contain
+commas, so ``parse_config`` is compared with ``expected_parse_config``: the
+reference parser with those two rules added by independent code.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import re
+import sys
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import benchmark
+import config
+import query
+import reference
+from instrument import instrument
+
+
+# ----------------------------------------------------------------------------
+# Running and comparing parsers
+# ----------------------------------------------------------------------------
+
+Outcome = Tuple[str, Any]  # ("ok", result) or ("error", description)
+
+
+def run_parser(func: Callable[[str], Any], text: str) -> Outcome:
+    """Run a parser, turning any exception into a comparable outcome"""
+    try:
+        return "ok", func(text)
+    except RecursionError:
+        return "error", "RecursionError"
+    except Exception as e:
+        return "error", f"{type(e).__name__}: {e}"
+
+
+# Number forms the single-pass parse_value reads that the original did not
+_DIGITS = r"\d(?:_?\d)*"
+_HEX_NUMBER = re.compile(r"[+-]?0[xX][0-9a-fA-F](?:_?[0-9a-fA-F])*")
+_EXPONENT_NUMBER = re.compile(
+    rf"[+-]?(?:{_DIGITS}(?:\.(?:{_DIGITS})?)?|\.{_DIGITS})[eE][+-]?{_DIGITS}"
+)
+
+
+def split_quoted_elements(array_content: str) -> List[str]:
+    """
+    Split array content on commas, keeping commas that sit inside an
+    element which starts (after spaces) with a quote that is closed later.
+    Written as a plain character walk, independently of benchmark.py.
+    """
+    elements = []
+    current = ""
+    quote = None
+    at_start = True
+    for index, char in enumerate(array_content):
+        if quote:
+            current += char
+            if char == quote:
+                quote = None
+            continue
+        if char == ",":
+            elements.append(current)
+            current = ""
+            at_start = True
+            continue
+        if at_start and char in "\"'" and char in array_content[index + 1 :]:
+            quote = char
+        if not char.isspace():
+            at_start = False
+        current += char
+    elements.append(current)
+    return elements
+
+
+_reference_parse_value = reference.parse_value
+
+
+def expected_parse_value(value_str: str) -> Any:
+    """
+    The original parse_value plus the changes made on purpose: hex and
+    exponent numbers, and commas inside quoted array elements.
+    """
+    value_str = value_str.strip()
+
+    if _HEX_NUMBER.fullmatch(value_str):
+        return int(value_str, 16)
+    if _EXPONENT_NUMBER.fullmatch(value_str):
+        return float(value_str)
+
+    if reference.is_array(value_str) and ("\"" in value_str or "'" in value_str):
+        array_content = value_str[1:-1].strip()
+        if not array_content:
+            return []
+        elements = []
+        for element in split_quoted_elements(array_content):
+            element = element.strip()
+            if reference.is_quoted_string(element):
+                element = element[1:-1]
+            elements.append(element)
+        return elements
+
+    return _reference_parse_value(value_str)
+
+
+def expected_parse_config(text: str) -> Dict[str, Any]:
+    """reference.parse_config, converting values with expected_parse_value"""
+    reference.parse_value = expected_parse_value
+    try:
+        return reference.parse_config(text)
+    finally:
+        reference.parse_value = _reference_parse_value
+
+
+def find_difference(expected: Any, actual: Any, path: str = "$") -> Optional[str]:
+    """Describe the first place two results differ, or None if they agree"""
+    if type(expected) is type(actual) and expected == actual:
+        return None
+
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        if list(expected) != list(actual):
+            return f"{path}: keys {list(expected)} != {list(actual)}"
+        for key in expected:
+            difference = find_difference(expected[key], actual[key], f"{path}.{key}")
+            if difference:
+                return difference
+        return None
+
+    if isinstance(expected, list) and isinstance(actual, list):
+        if len(expected) == len(actual):
+            for index, (left, right) in enumerate(zip(expected, actual)):
+                difference = find_difference(left, right, f"{path}[{index}]")
+                if difference:
+                    return difference
+            return None
+
+    return f"{path}: {expected!r} != {actual!r}"
+
+
+def compare_outcomes(expected: Outcome, actual: Outcome) -> Optional[str]:
+    if expected[0] != actual[0]:
+        return f"reference {expected[0]} ({expected[1]!r}), candidate {actual[0]} ({actual[1]!r})"
+    if expected[0] == "error":
+        if expected[1] != actual[1]:
+            return f"errors differ: {expected[1]!r} != {actual[1]!r}"
+        return None
+    return find_difference(expected[1], actual[1])
+
+
+# ----------------------------------------------------------------------------
+# Modes under test
+# ----------------------------------------------------------------------------
+
+
+class Mode(NamedTuple):
+    """An optimised parser path and the reference it must agree with"""
+
+    name: str
+    grammar: str  # "block" or "section"
+    reference: Callable[[str], Any]
+    candidate: Callable[[str], Any]
+
+    def check(self, text: str) -> Optional[str]:
+        return compare_outcomes(
+            run_parser(self.reference, text),
+            run_parser(self.candidate, text),
+        )
+
+
+def _instrumented(func: Callable[[str], Any]) -> Callable[[str], Any]:
+    def run(text: str) -> Any:
+        with instrument():
+            return func(text)
+
+    return run
+
+
+def _projection_mode(path: str) -> Mode:
+    compiled = query.compile_query(path)
+    return Mode(
+        f"ProjectingParser[{path}]",
+        "block",
+        lambda text: compiled.match(reference.ConfigParser(text).parse()),
+        lambda text: compiled.match(query.ProjectingParser(text, compiled).parse()),
+    )
+
+
+MODES: List[Mode] = [
+    Mode(
+        "ConfigParser",
+        "block",
+        lambda text: reference.ConfigParser(text).parse(),
+        lambda text: config.ConfigParser(text).parse(),
+    ),
+    Mode(
+        "ConfigParser+instrument",
+        "block",
+        lambda text: reference.ConfigParser(text).parse(),
+        _instrumented(lambda text: config.ConfigParser(text).parse()),
+    ),
+    _projection_mode("server"),
+    _projection_mode("server[*].location[*].proxy_pass"),
+    _projection_mode("*.add[-1]"),
+    _projection_mode('*."v1.2"[*].add'),
+    Mode(
+        "parse_config",
+        "section",
+        expected_parse_config,
+        benchmark.parse_config,
+    ),
+    Mode(
+        "parse_config+instrument",
+        "section",
+        expected_parse_config,
+        _instrumented(benchmark.parse_config),
+    ),
+]
+
+
+# ----------------------------------------------------------------------------
+# Input generation
+# ----------------------------------------------------------------------------
+
+BLOCK_NAMES = ["server", "location", "listen", "proxy_pass", "headers", "add", "a", "x-y", "v1.2"]
+BLOCK_VALUES = [
+    "80", "example.com", "/var/www", "http://backend:8080", "$host", "a,b",
+    '"value with spaces"', "'single quoted'", '"esc\\"aped\\n"', '""', '"a;b{c}"',
+    '"a\\";b{c}"', "'x\\';}'",
+]
+
+SECTION_NAMES = ["database", "server", "server.auth", "server.logging", "cache", "a.b.c"]
+SECTION_KEYS = ["host", "port", "enabled", "timeout", "providers", "level", "ttl"]
+SECTION_VALUES = [
+    '"localhost"', "'single'", "plain", "42", "-17", "+3", "3.5", "-.5", "1_000",
+    "1e5", "0x1F", "true", "False", "TRUE", '["a", "b"]', '["a, b", c]', "[]",
+    "[1, 2, 3]", "[don't, 'x, y']", '""', "1.2.3", "inf", "1" * 5000,
+]
+
+# Characters mutations insert; mostly syntax so they hit the interesting paths
+MUTATION_CHARS = '{}[];="\'\\#., \n\tax0-'
+
+
+def generate_block_config(rng: random.Random, depth: int = 0) -> str:
+    indent = "    " * depth
+    lines = []
+    for _ in range(rng.randint(1, 5 if depth else 4)):
+        name = rng.choice(BLOCK_NAMES)
+        if depth < 3 and rng.random() < 0.35:
+            lines.append(f"{indent}{name} {{")
+            lines.append(generate_block_config(rng, depth + 1))
+            lines.append(f"{indent}}}")
+        else:
+            values = " ".join(rng.choice(BLOCK_VALUES) for _ in range(rng.randint(1, 3)))
+            lines.append(f"{indent}{name} {values};")
+    return "\n".join(lines)
+
+
+def generate_section_config(rng: random.Random) -> str:
+    lines = []
+    for _ in range(rng.randint(0, 2)):
+        lines.append(f"{rng.choice(SECTION_KEYS)} = {rng.choice(SECTION_VALUES)}")
+    for _ in range(rng.randint(1, 4)):
+        if rng.random() < 0.2:
+            lines.append("# comment")
+        lines.append(f"[{rng.choice(SECTION_NAMES)}]")
+        for _ in range(rng.randint(0, 4)):
+            indent = "    " if rng.random() < 0.3 else ""
+            lines.append(
+                f"{indent}{rng.choice(SECTION_KEYS)} = {rng.choice(SECTION_VALUES)}"
+            )
+        lines.append("")
+    return "\n".join(lines)
+
+
+GENERATORS: Dict[str, Callable[[random.Random], str]] = {
+    "block": generate_block_config,
+    "section": generate_section_config,
+}
+
+
+def mutate(rng: random.Random, text: str) -> str:
+    """Apply a few random character and line edits"""
+    for _ in range(rng.randint(1, 3)):
+        operation = rng.randrange(5)
+        if operation == 0 and text:
+            index = rng.randrange(len(text))
+            text = text[:index] + text[index + 1 :]
+        elif operation == 1:
+            index = rng.randint(0, len(text))
+            text = text[:index] + rng.choice(MUTATION_CHARS) + text[index:]
+        elif operation == 2:
+            lines = text.split("\n")
+            index = rng.randrange(len(lines))
+            lines.insert(index, lines[index])
+            text = "\n".join(lines)
+        elif operation == 3:
+            lines = text.split("\n")
+            del lines[rng.randrange(len(lines))]
+            text = "\n".join(lines)
+        else:
+            text = text[: rng.randint(0, len(text))]
+    return text
+
+
+# ----------------------------------------------------------------------------
+# Minimisation
+# ----------------------------------------------------------------------------
+
+
+def minimize(text: str, still_fails: Callable[[str], bool]) -> str:
+    """Delta-debug ``text`` down to a small input that still fails"""
+    for split in (lambda t: t.splitlines(keepends=True), list):
+        parts = split(text)
+        chunks = 2
+        while len(parts) >= 2:
+            size = math.ceil(len(parts) / chunks)
+            for start in range(0, len(parts), size):
+                candidate = parts[:start] + parts[start + size :]
+                if still_fails("".join(candidate)):
+                    parts = candidate
+                    chunks = max(chunks - 1, 2)
+                    break
+            else:
+                if chunks >= len(parts):
+                    break
+                chunks = min(chunks * 2, len(parts))
+        text = "".join(parts)
+    return text
+
+
+# ----------------------------------------------------------------------------
+# Commands
+# ----------------------------------------------------------------------------
+
+
+class Mismatch(NamedTuple):
+    mode: str
+    iteration: int
+    text: str
+    difference: str
+
+
+def fuzz(seed: int, iterations: int, modes: List[Mode]) -> List[Mismatch]:
+    """Run every mode against the references; one mismatch per mode at most"""
+    rng = random.Random(seed)
+    mismatches: Dict[str, Mismatch] = {}
+
+    for iteration in range(iterations):
+        for grammar, generate in GENERATORS.items():
+            text = generate(rng)
+            if rng.random() < 0.5:
+                text = mutate(rng, text)
+
+            for mode in modes:
+                if mode.grammar != grammar or mode.name in mismatches:
+                    continue
+                if mode.check(text) is None:
+                    continue
+
+                smallest = minimize(text, lambda t: mode.check(t) is not None)
+                mismatches[mode.name] = Mismatch(
+                    mode.name, iteration, smallest, mode.check(smallest)
+                )
+
+    return list(mismatches.values())
+
+
+def standard_corpus() -> Dict[str, Tuple[str, str]]:
+    """Corpus name -> (grammar, text) used for throughput measurements"""
+    return {
+        "block_sample": ("block", query.SAMPLE_CONFIG * 50),
+        "section_sample": ("section", benchmark.create_sample_config() * 20),
+        "section_values": ("section", benchmark.create_value_heavy_config()),
+    }
+
+
+# Parser name -> (grammar, function); the reference for each grammar is timed
+# alongside it so the gate compares speed-ups, not raw machine speed
+PERF_PARSERS: Dict[str, Tuple[str, Callable[[str], Any]]] = {
+    "ConfigParser": ("block", lambda text: config.ConfigParser(text).parse()),
+    "ProjectingParser": (
+        "block",
+        lambda text: query.ProjectingParser(text, "server.location.proxy_pass").parse(),
+    ),
+    "parse_config": ("section", benchmark.parse_config),
+}
+
+PERF_REFERENCES: Dict[str, Callable[[str], Any]] = {
+    "block": lambda text: reference.ConfigParser(text).parse(),
+    "section": reference.parse_config,
+}
+
+
+def _time_once(func: Callable[[str], Any], text: str, min_time: float = 0.02) -> float:
+    """Seconds per call, repeating until the total is long enough to time"""
+    runs = 0
+    start = time.perf_counter()
+    while True:
+        func(text)
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return elapsed / runs
+
+
+def measure_speedup(
+    func: Callable[[str], Any],
+    baseline_func: Callable[[str], Any],
+    text: str,
+    rounds: int = 7,
+) -> Tuple[float, float]:
+    """
+    Best-of-``rounds`` characters per second for ``func``, and its speed
+    relative to ``baseline_func``. The two are timed in alternating rounds
+    so both see the same machine conditions.
+    """
+    best = best_baseline = math.inf
+    for _ in range(rounds):
+        best = min(best, _time_once(func, text))
+        best_baseline = min(best_baseline, _time_once(baseline_func, text))
+    return len(text) / best, best_baseline / best
+
+
+def measure_all() -> Dict[str, Dict[str, float]]:
+    """Case name -> {"chars_per_second": ..., "speedup": ...}"""
+    results = {}
+    for corpus_name, (grammar, text) in standard_corpus().items():
+        for parser_name, (parser_grammar, func) in PERF_PARSERS.items():
+            if parser_grammar != grammar:
+                continue
+            rate, speedup = measure_speedup(func, PERF_REFERENCES[grammar], text)
+            results[f"{parser_name}/{corpus_name}"] = {
+                "chars_per_second": rate,
+                "speedup": speedup,
+            }
+    return results
+
+
+def perf_gate(
+    baseline_path: str,
+    threshold: float,
+    update: bool,
+    raw_threshold: Optional[float] = None,
+) -> bool:
+    """
+    Compare with the stored baseline; True if nothing regressed.
+
+    The gate uses each parser's speed-up over the frozen reference
+    implementation measured in the same run, which holds steady across
+    machines and load. Characters per second are also checked when
+    ``raw_threshold`` is given, and are otherwise shown for context.
+    """
+    current = measure_all()
+
+    if update:
+        with open(baseline_path, "w", encoding="utf-8") as handle:
+            json.dump(current, handle, indent=2, sort_keys=True)
+            handle.write("\n")
+        print(f"Baseline written to {baseline_path}")
+        return True
+
+    if not os.path.exists(baseline_path):
+        print(f"✗ No baseline at {baseline_path}; run with --update-baseline first")
+        return False
+
+    with open(baseline_path, encoding="utf-8") as handle:
+        baseline = json.load(handle)
+
+    speed_passed = raw_passed = True
+    print(
+        f"{'case':<34}{'chars/s':>12}{'change':>9}"
+        f"{'baseline':>10}{'speedup':>9}{'change':>9}"
+    )
+    for case, result in sorted(current.items()):
+        rate, speedup = result["chars_per_second"], result["speedup"]
+        if case not in baseline:
+            print(f"{case:<34}{rate:>12,.0f}{'-':>9}{'-':>10}{speedup:>8.2f}x   (new)")
+            continue
+        expected = baseline[case]["speedup"]
+        change = speedup / expected - 1
+        rate_change = rate / baseline[case]["chars_per_second"] - 1
+        speed_regressed = change < -threshold
+        raw_regressed = raw_threshold is not None and rate_change < -raw_threshold
+        speed_passed = speed_passed and not speed_regressed
+        raw_passed = raw_passed and not raw_regressed
+        print(
+            f"{case:<34}{rate:>12,.0f}{rate_change:>9.1%}"
+            f"{expected:>9.2f}x{speedup:>8.2f}x{change:>9.1%}"
+            + ("  ✗" if speed_regressed or raw_regressed else "")
+        )
+
+    print(f"\n{'✓' if speed_passed else '✗'} speed-up threshold: -{threshold:.0%}")
+    if raw_threshold is not None:
+        print(f"{'✓' if raw_passed else '✗'} chars/s threshold:  -{raw_threshold:.0%}")
+    return speed_passed and raw_passed
+
+
+def run_fuzz(seed: int, iterations: int, mode_names: Optional[List[str]]) -> bool:
+    modes = [mode for mode in MODES if not mode_names or mode.name in mode_names]
+    mismatches = fuzz(seed, iterations, modes)
+
+    print(f"Fuzzed {len(modes)} modes, seed {seed}, {iterations} iterations")
+    for mismatch in mismatches:
+        print(f"\n✗ {mismatch.mode} (iteration {mismatch.iteration})")
+        print(f"  input:      {mismatch.text!r}")
+        print(f"  difference: {mismatch.difference}")
+    if not mismatches:
+        print("✓ All modes agree with the reference implementations")
+    return not mismatches
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+
+    fuzz_args = argparse.ArgumentParser(add_help=False)
+    fuzz_args.add_argument("--seed", type=int, default=0)
+    fuzz_args.add_argument("--iterations", type=int, default=500)
+    fuzz_args.add_argument(
+        "--mode",
+        action="append",
+        choices=[mode.name for mode in MODES],
+        help="mode to fuzz (repeatable, default: all)",
+    )
+
+    perf_args = argparse.ArgumentParser(add_help=False)
+    perf_args.add_argument(
+        "--baseline",
+        default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "perf_baseline.json"),
+        help="stored speed-up and throughput baseline (JSON)",
+    )
+    perf_args.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="largest allowed fractional drop in speed-up over the reference",
+    )
+    perf_args.add_argument(
+        "--raw-threshold",
+        type=float,
+        help="also fail on a larger fractional drop in chars/s "
+        "(only meaningful on the machine that recorded the baseline)",
+    )
+    perf_args.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="record current speed-ups and throughput as the new baseline",
+    )
+
+    commands.add_parser("fuzz", parents=[fuzz_args], help="differential fuzzing")
+    commands.add_parser("perf", parents=[perf_args], help="speed regression gate")
+    commands.add_parser("all", parents=[fuzz_args, perf_args], help="fuzz, then perf")
+    args = arg_parser.parse_args()
+
+    passed = True
+    if args.command in ("fuzz", "all"):
+        passed = run_fuzz(args.seed, args.iterations, args.mode) and passed
+    if args.command in ("perf", "all"):
+        if args.command == "all":
+            print()
+        passed = (
+            perf_gate(
+                args.baseline, args.threshold, args.update_baseline, args.raw_threshold
+            )
+            and passed
+        )
+
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Parser Instrumentation
+======================
+
+Opt-in timing and counting hooks for both example parsers:
+
+* ``ConfigParser`` from ``config.py`` (brace-delimited, nginx style)
+* ``parse_config`` from ``benchmark.py`` (section based, INI style)
+
+Nothing here is active until you ask for it. The hooks are installed by
+swapping the parser functions for timing wrappers inside a ``with
+instrument()`` block and restoring the originals on exit, so the parsers run
+exactly as written (zero overhead) the rest of the time.
+
+Every hooked function belongs to a phase:
+
+    tokenize       reading identifiers, values, whitespace and key/value lines
+    quoted_string  decoding quoted strings and escapes
+    merge          merging directives and sections into the result dictionary
+    convert        typed value conversion (parse_value, try_parse_number, ...)
+    structure      the block/section walking that ties the phases together
+
+Usage:
+
+    with instrument() as stats:
+        ConfigParser(CONFIG_TEXT).parse()
+    print(stats.report())
+    stats.write_collapsed("parse.folded")   # feed to flamegraph.pl
+
+Note that the wrappers add their own cost to every call, so absolute times
+are inflated; the split between phases is what to look at.
+"""
+
+import argparse
+import functools
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+import benchmark
+import config
+
+
+# Phase for each hooked function, per parser. Roots are the entry points and
+# are reported under the "parse" phase.
+CONFIG_PARSER_PHASES = {
+    "parse": "parse",
+    "parse_block": "structure",
+    "skip_whitespace": "tokenize",
+    "read_identifier": "tokenize",
+    "read_value": "tokenize",
+    "read_directive_value": "tokenize",
+    "read_quoted_string": "quoted_string",
+    "store_directive": "merge",
+}
+
+FUNCTIONAL_PARSER_PHASES = {
+    "parse_config": "parse",
+    "parse_section": "structure",
+    "parse_section_contents": "structure",
+    "parse_key_value_line": "tokenize",
+    "unquote_string": "quoted_string",
+    "is_quoted_string": "quoted_string",
+    "set_nested_dict": "merge",
+    "parse_value": "convert",
+    "parse_array": "convert",
+    "_parse_quoted_array": "convert",
+    "split_array_elements": "convert",
+    "try_parse_number": "convert",
+}
+
+
+class PhaseStats:
+    """Accumulated calls and self time for one phase or function"""
+
+    __slots__ = ("calls", "seconds")
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+
+    def __repr__(self) -> str:
+        return f"PhaseStats(calls={self.calls}, seconds={self.seconds:.6f})"
+
+
+class ParseStats:
+    """
+    Timers and counters collected while instrumentation is enabled.
+
+    Times are *self* times: a function's time excludes the time spent in
+    other hooked functions it calls, so the phases add up to the total.
+    """
+
+    def __init__(self):
+        self.phases: Dict[str, PhaseStats] = {}
+        self.functions: Dict[str, PhaseStats] = {}
+        self.counters: Dict[str, int] = {}
+        self.collapsed: Dict[str, float] = {}
+        # Each frame: [name, start time, time spent in hooked children]
+        self._stack: List[List[Any]] = []
+
+    def count(self, name: str, amount: int = 1):
+        """Increment a named counter"""
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def enter(self, name: str):
+        """Record entry into a hooked function"""
+        self._stack.append([name, time.perf_counter(), 0.0])
+
+    def leave(self, phase: str):
+        """Record exit from the innermost hooked function"""
+        name, start, child_time = self._stack.pop()
+        elapsed = time.perf_counter() - start
+        self_time = elapsed - child_time
+
+        if self._stack:
+            self._stack[-1][2] += elapsed
+
+        for table, key in ((self.phases, phase), (self.functions, name)):
+            entry = table.get(key)
+            if entry is None:
+                entry = table[key] = PhaseStats()
+            entry.calls += 1
+            entry.seconds += self_time
+
+        stack_key = self._stack_key(name)
+        self.collapsed[stack_key] = self.collapsed.get(stack_key, 0.0) + self_time
+
+    def _stack_key(self, leaf: str) -> str:
+        """Semicolon separated call stack, with direct recursion folded"""
+        frames = []
+        for frame in self._stack:
+            if not frames or frames[-1] != frame[0]:
+                frames.append(frame[0])
+        if not frames or frames[-1] != leaf:
+            frames.append(leaf)
+        return ";".join(frames)
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(entry.seconds for entry in self.phases.values())
+
+    def collapsed_lines(self) -> List[str]:
+        """Collapsed stacks in the format flamegraph.pl expects (microseconds)"""
+        lines = []
+        for stack, seconds in sorted(self.collapsed.items()):
+            micros = round(seconds * 1_000_000)
+            if micros > 0:
+                lines.append(f"{stack} {micros}")
+        return lines
+
+    def write_collapsed(self, path: str):
+        """Write collapsed stacks to a file for flamegraph tooling"""
+        with open(path, "w", encoding="utf-8") as handle:
+            for line in self.collapsed_lines():
+                handle.write(line + "\n")
+
+    def report(self) -> str:
+        """Human readable breakdown by phase, then by function"""
+        total = self.total_seconds or 1e-12
+        lines = [f"{'phase':<16}{'calls':>10}{'ms':>12}{'share':>9}"]
+        for phase, entry in sorted(
+            self.phases.items(), key=lambda item: -item[1].seconds
+        ):
+            lines.append(
+                f"{phase:<16}{entry.calls:>10}{entry.seconds * 1000:>12.3f}"
+                f"{entry.seconds / total:>9.1%}"
+            )
+
+        lines.append("")
+        lines.append(f"{'function':<28}{'calls':>10}{'ms':>12}")
+        for name, entry in sorted(
+            self.functions.items(), key=lambda item: -item[1].seconds
+        ):
+            lines.append(f"{name:<28}{entry.calls:>10}{entry.seconds * 1000:>12.3f}")
+
+        if self.counters:
+            lines.append("")
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"{name:<28}{value:>10}")
+
+        return "\n".join(lines)
+
+
+def _wrap(func: Callable, name: str, phase: str, stats: ParseStats) -> Callable:
+    """Build a timing wrapper around a single function"""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        stats.enter(name)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stats.leave(phase)
+
+    return wrapper
+
+
+def _wrap_root(func: Callable, name: str, stats: ParseStats, size: Callable) -> Callable:
+    """Timing wrapper for a parser entry point that also counts input size"""
+    inner = _wrap(func, name, "parse", stats)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        stats.count(f"{name}.calls")
+        stats.count(f"{name}.chars", size(*args, **kwargs))
+        return inner(*args, **kwargs)
+
+    return wrapper
+
+
+def _install(stats: ParseStats) -> List[Tuple[Any, str, Any]]:
+    """Swap hooked functions for wrappers, returning what to restore"""
+    originals = []
+
+    for attr, phase in CONFIG_PARSER_PHASES.items():
+        original = config.ConfigParser.__dict__[attr]
+        name = f"ConfigParser.{attr}"
+        if phase == "parse":
+            wrapped = _wrap_root(original, name, stats, lambda self: self.length)
+        elif isinstance(original, staticmethod):
+            # Wrap the plain function, then make the wrapper static again
+            wrapped = staticmethod(_wrap(original.__func__, name, phase, stats))
+        else:
+            wrapped = _wrap(original, name, phase, stats)
+        originals.append((config.ConfigParser, attr, original))
+        setattr(config.ConfigParser, attr, wrapped)
+
+    # parse_config and friends call each other through module globals, so
+    # replacing the globals is enough for the internal calls to be seen
+    for attr, phase in FUNCTIONAL_PARSER_PHASES.items():
+        original = getattr(benchmark, attr)
+        if phase == "parse":
+            wrapped = _wrap_root(original, attr, stats, lambda text: len(text))
+        else:
+            wrapped = _wrap(original, attr, phase, stats)
+        originals.append((benchmark, attr, original))
+        setattr(benchmark, attr, wrapped)
+
+    return originals
+
+
+@contextmanager
+def instrument() -> Iterator[ParseStats]:
+    """
+    Enable instrumentation for the duration of the block.
+
+    The hooks are process wide (they patch the parser class and module), so
+    avoid parsing from other threads while a block is active.
+    """
+    stats = ParseStats()
+    originals = _install(stats)
+    try:
+        yield stats
+    finally:
+        for owner, attr, original in reversed(originals):
+            setattr(owner, attr, original)
+
+
+def profile_parse(text: str, parser: str = "block") -> Tuple[Dict[str, Any], ParseStats]:
+    """
+    Parse ``text`` once with instrumentation enabled.
+
+    ``parser`` selects ``"block"`` (ConfigParser) or ``"section"``
+    (parse_config). Returns the parse result alongside its stats.
+    """
+    with instrument() as stats:
+        if parser == "block":
+            result = config.ConfigParser(text).parse()
+        elif parser == "section":
+            result = benchmark.parse_config(text)
+        else:
+            raise ValueError(f"Unknown parser: {parser}")
+    return result, stats
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    arg_parser.add_argument(
+        "file",
+        nargs="?",
+        help="config file to parse (defaults to the built-in sample)",
+    )
+    arg_parser.add_argument(
+        "--parser",
+        choices=("block", "section"),
+        default="block",
+        help="block: ConfigParser, section: parse_config",
+    )
+    arg_parser.add_argument(
+        "--collapsed",
+        metavar="PATH",
+        help="write flamegraph-compatible collapsed stacks to PATH",
+    )
+    args = arg_parser.parse_args()
+
+    if args.file:
+        with open(args.file, encoding="utf-8") as handle:
+            text = handle.read()
+    elif args.parser == "block":
+        text = config.CONFIG_TEXT
+    else:
+        text = benchmark.create_sample_config()
+
+    _, stats = profile_parse(text, args.parser)
+    print(stats.report())
+
+    if args.collapsed:
+        stats.write_collapsed(args.collapsed)
+        print(f"\nCollapsed stacks written to {args.collapsed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Pathological Input Benchmark
+============================
+
+The talk claims that the regex approaches break down on nested input. This
+script measures *how*: every approach is fed adversarial inputs of doubling
+size and we watch how the run time grows.
+
+Input families, for the brace-delimited grammar of config.py:
+
+    deep_nesting        a { a { a { ... k v; } } }
+    unbalanced_braces   a { a { a { ...            (never closed)
+    unterminated_quote  k "x x x x ...             (quote never closed)
+    missing_semicolon   k v v v v ...              (directive never ends)
+
+and for the section grammar of benchmark.py:
+
+    many_sections       [s0] k = v [s1] k = v ...
+    deep_section_path   [a.a.a.a ... a] k = v
+    unclosed_header     [aaaa ...                  (header never closed)
+    long_value          k = "x x x x ...           (quote never closed)
+
+Each (approach, family, size) case runs in its own subprocess with a hard
+timeout, so a catastrophically backtracking pattern cannot hang the run.
+Between two sizes n1 < n2 the growth exponent is
+
+    k = log(t2 / t1) / log(n2 / n1)
+
+which is ~1 for linear work and ~2 for quadratic. An approach is reported as
+super-linear from the first size where k stays above the threshold, or as
+failing from the first size where it times out, raises or crashes, alongside
+the same figure for the proper parser of that grammar (ConfigParser or
+parse_config).
+"""
+
+import argparse
+import math
+import multiprocessing
+import re
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import benchmark
+import config
+
+
+def deep_nesting(n: int) -> str:
+    return "a {\n" * n + "k v;\n" + "}\n" * n
+
+
+def unbalanced_braces(n: int) -> str:
+    return "a {\n" * n
+
+
+def unterminated_quote(n: int) -> str:
+    return 'k "' + "x " * n
+
+
+def missing_semicolon(n: int) -> str:
+    return "k " + "v " * n
+
+
+def many_sections(n: int) -> str:
+    return "".join(f"[s{i}]\nk = v\n" for i in range(n))
+
+
+def deep_section_path(n: int) -> str:
+    return "[" + ".".join(["a"] * n) + "]\nk = v\n"
+
+
+def unclosed_header(n: int) -> str:
+    return "[" + "a" * n + "\n"
+
+
+def long_value(n: int) -> str:
+    return '[s]\nk = "' + "x " * n + "\n"
+
+
+# Family name -> (grammar, input generator)
+FAMILIES: Dict[str, Tuple[str, Callable[[int], str]]] = {
+    "deep_nesting": ("block", deep_nesting),
+    "unbalanced_braces": ("block", unbalanced_braces),
+    "unterminated_quote": ("block", unterminated_quote),
+    "missing_semicolon": ("block", missing_semicolon),
+    "many_sections": ("section", many_sections),
+    "deep_section_path": ("section", deep_section_path),
+    "unclosed_header": ("section", unclosed_header),
+    "long_value": ("section", long_value),
+}
+
+_REGEX_PARSER = config.RegexParser()
+
+
+def _parse_config_or_reject(text: str):
+    """parse_config, counting a clean ParseError as a finished run"""
+    try:
+        return benchmark.parse_config(text)
+    except benchmark.ParseError:
+        return None
+
+
+# Approach name -> (grammar, function to run on the input)
+APPROACHES: Dict[str, Tuple[str, Callable[[str], object]]] = {
+    "simple_pattern": (
+        "block",
+        lambda text: re.findall(_REGEX_PARSER.simple_pattern, text),
+    ),
+    "block_pattern": (
+        "block",
+        lambda text: re.findall(_REGEX_PARSER.block_pattern, text),
+    ),
+    "nested_pattern": (
+        "block",
+        lambda text: re.findall(_REGEX_PARSER.nested_pattern, text),
+    ),
+    "RegexParser": ("block", _REGEX_PARSER.parse),
+    "ConfigParser": ("block", lambda text: config.ConfigParser(text).parse()),
+    "regex_attempt": ("section", benchmark.regex_attempt),
+    "parse_config": ("section", _parse_config_or_reject),
+}
+
+# The proper parser each grammar's regex approaches are compared against
+BASELINES = {"block": "ConfigParser", "section": "parse_config"}
+
+
+class Measurement(NamedTuple):
+    """Outcome of one (approach, family, size) case"""
+
+    size: int
+    seconds: Optional[float]  # best time per run; None unless status is "ok"
+    status: str  # "ok", "timeout", "crashed (exit N)" or the exception raised
+
+
+def _time_case(approach: str, family: str, repeat: int, connection):
+    """Child process body: build the input and time the approach on it"""
+    text = FAMILIES[family][1](repeat)
+    func = APPROACHES[approach][1]
+    best = math.inf
+    try:
+        # Several rounds, each repeated until it is long enough to time
+        # reliably; the fastest round is the least disturbed by noise
+        for _ in range(5):
+            runs = 0
+            start = time.perf_counter()
+            while True:
+                func(text)
+                runs += 1
+                elapsed = time.perf_counter() - start
+                if elapsed >= 0.01 or runs >= 1000:
+                    break
+            best = min(best, elapsed / runs)
+            if elapsed >= 0.5:
+                break
+    except Exception as e:
+        # The approach gave up on this input (e.g. RecursionError on deep
+        # nesting); that is a finding in itself
+        connection.send((len(text), None, type(e).__name__))
+    else:
+        connection.send((len(text), best, "ok"))
+    connection.close()
+
+
+def measure(approach: str, family: str, repeat: int, timeout: float) -> Measurement:
+    """Run a single case in a subprocess, killing it after ``timeout`` seconds"""
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(
+        target=_time_case, args=(approach, family, repeat, sender)
+    )
+    process.start()
+    sender.close()
+
+    if receiver.poll(timeout):
+        try:
+            size, seconds, status = receiver.recv()
+        except EOFError:
+            # The child died without reporting (e.g. a C stack overflow or
+            # the OOM killer); poll() is also true at end of file
+            process.join()
+            size = len(FAMILIES[family][1](repeat))
+            return Measurement(size, None, f"crashed (exit {process.exitcode})")
+        process.join()
+        return Measurement(size, seconds, status)
+
+    process.terminate()
+    process.join()
+    return Measurement(len(FAMILIES[family][1](repeat)), None, "timeout")
+
+
+def growth_exponent(first: Measurement, second: Measurement) -> Optional[float]:
+    """Log-log slope between two measurements, if both are usable"""
+    if first.seconds is None or second.seconds is None:
+        return None
+    if first.size == second.size or min(first.seconds, second.seconds) <= 0:
+        return None
+    return math.log(second.seconds / first.seconds) / math.log(second.size / first.size)
+
+
+def find_onset(
+    measurements: List[Measurement], threshold: float, noise_floor: float
+) -> Optional[Measurement]:
+    """
+    First measurement where growth goes super-linear, or where the approach
+    stopped finishing. Growth has to exceed the threshold on two consecutive
+    doublings so a single noisy timing does not trigger it.
+    """
+    if measurements[0].status != "ok":
+        return measurements[0]
+
+    suspect = None
+    for previous, current in zip(measurements, measurements[1:]):
+        if current.status != "ok":
+            return suspect or current
+        if previous.seconds < noise_floor:
+            continue
+        exponent = growth_exponent(previous, current)
+        if exponent is not None and exponent > threshold:
+            if suspect is not None:
+                return suspect
+            suspect = current
+        else:
+            suspect = None
+    return None
+
+
+MIN_REPEAT = 16
+
+
+def sweep(
+    approach: str,
+    family: str,
+    max_repeat: int,
+    timeout: float,
+) -> List[Measurement]:
+    """Double the input size until it reaches ``max_repeat`` or stops finishing"""
+    measurements = []
+    repeat = MIN_REPEAT
+    while repeat <= max_repeat:
+        measurement = measure(approach, family, repeat, timeout)
+        measurements.append(measurement)
+        if measurement.status != "ok":
+            break
+        repeat *= 2
+    return measurements
+
+
+def describe(measurements: List[Measurement], onset: Optional[Measurement]) -> str:
+    """One line summary of a sweep"""
+    last = measurements[-1]
+    if onset is None:
+        return f"linear up to     {last.size:>9,} chars ({last.seconds * 1000:9.3f} ms)"
+    if onset.status == "timeout":
+        return f"TIMEOUT at       {onset.size:>9,} chars"
+    if onset.status != "ok":
+        return f"fails at         {onset.size:>9,} chars ({onset.status})"
+    return (
+        f"super-linear at  {onset.size:>9,} chars "
+        f"({onset.seconds * 1000:9.3f} ms)"
+    )
+
+
+def run(
+    approaches: List[str],
+    families: List[str],
+    max_repeat: int,
+    timeout: float,
+    threshold: float,
+    noise_floor: float,
+):
+    print("=" * 80)
+    print("PATHOLOGICAL INPUT BENCHMARK")
+    print("=" * 80)
+    print(f"timeout {timeout}s per case, super-linear when growth exponent > {threshold}")
+
+    for family in families:
+        grammar = FAMILIES[family][0]
+        baseline = BASELINES[grammar]
+        print(f"\n--- {family} ({grammar} grammar) ---")
+        onsets = {}
+        for approach in approaches:
+            if APPROACHES[approach][0] != grammar:
+                continue
+            measurements = sweep(approach, family, max_repeat, timeout)
+            onset = find_onset(measurements, threshold, noise_floor)
+            onsets[approach] = onset
+            print(f"{approach:<16}{describe(measurements, onset)}")
+
+        if baseline not in onsets:
+            continue
+        baseline_onset = onsets[baseline]
+        for approach, onset in onsets.items():
+            if approach == baseline:
+                continue
+            if onset is not None and (
+                baseline_onset is None or onset.size < baseline_onset.size
+            ):
+                print(f"  ✗ {approach} degrades before {baseline}")
+            elif baseline_onset is not None and (
+                onset is None or baseline_onset.size < onset.size
+            ):
+                print(f"  ! {baseline} degrades before {approach}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    arg_parser.add_argument(
+        "--approach",
+        action="append",
+        choices=sorted(APPROACHES),
+        help="approach to measure (repeatable, default: all)",
+    )
+    arg_parser.add_argument(
+        "--family",
+        action="append",
+        choices=sorted(FAMILIES),
+        help="input family to generate (repeatable, default: all)",
+    )
+    arg_parser.add_argument(
+        "--max-repeat",
+        type=int,
+        default=8192,
+        help="largest repetition count passed to the input generators "
+        f"(sweeps start at {MIN_REPEAT})",
+    )
+    arg_parser.add_argument(
+        "--timeout", type=float, default=5.0, help="seconds allowed per case"
+    )
+    arg_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.5,
+        help="growth exponent above which growth counts as super-linear",
+    )
+    arg_parser.add_argument(
+        "--noise-floor",
+        type=float,
+        default=1e-4,
+        help="ignore growth measured from runs faster than this many seconds",
+    )
+    args = arg_parser.parse_args()
+    if args.max_repeat < MIN_REPEAT:
+        arg_parser.error(f"--max-repeat must be at least {MIN_REPEAT}")
+
+    run(
+        args.approach or list(APPROACHES),
+        args.family or list(FAMILIES),
+        args.max_repeat,
+        args.timeout,
+        args.threshold,
+        args.noise_floor,
+    )
+
+
+if __name__ == "__main__":
+    main()
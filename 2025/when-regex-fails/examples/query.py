@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Config Queries and Projection
+=============================
+
+A small path language for pulling values out of parsed configs, so callers
+stop walking nested dicts by hand:
+
+    server.listen                       every server's listen directive
+    server[*].location[*].proxy_pass    proxy_pass of every location of every server
+    upstream.server[0]                  first server line of the upstream block
+    *.timeout                           timeout directly inside any top-level block
+
+``ConfigParser.parse_block`` stores a directive that appears once as its
+value, and one that is repeated as a list of values. Queries hide that:
+
+    name        the value as stored; a following step walks into every
+                block in it, however many occurrences there are
+    name[*]     each occurrence (or each element of a parse_config array)
+    name[N]     the N-th occurrence (negative N counts from the end)
+    *           any directive name
+    "v1.2"      a name taken literally, for names containing '.', '[' or
+                '*' (single quotes work too; backslash escapes a quote)
+
+A query is compiled once into a ``Query`` and can then be matched against any
+number of trees, from ``ConfigParser`` or from ``parse_config``.
+
+For big brace-delimited files ``ProjectingParser`` applies a query while
+parsing: blocks whose name cannot lead to a match are walked past without
+being built, and ``query.match()`` on the projected tree gives the same
+answer as on the full one.
+"""
+
+import re
+import time
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+import config
+
+
+class QueryError(Exception):
+    def __init__(self, column: int, message: str):
+        self.column = column
+        self.message = message
+        super().__init__(f"Column {column}: {message}")
+
+
+class Step(NamedTuple):
+    """One segment of a query: a directive name and an optional index"""
+
+    name: Optional[str]  # None matches any name
+    index: Union[None, str, int]  # None, "*" or an occurrence number
+
+    def matches(self, directive: str) -> bool:
+        return self.name is None or self.name == directive
+
+
+_STEP_PATTERN = re.compile(
+    r"""(?:(\*|[\w\-/]+)|"((?:[^"\\]|\\.)*)"|'((?:[^'\\]|\\.)*)')"""
+    r"(?:\[(\*|-?\d+)\])?",
+    re.DOTALL,
+)
+_ESCAPE = re.compile(r"\\(.)", re.DOTALL)
+
+
+def _occurrences(value: Any) -> List[Any]:
+    """Every occurrence of a directive, whether it was stored once or repeated"""
+    return value if isinstance(value, list) else [value]
+
+
+class Query:
+    """A compiled path query, reusable across many trees"""
+
+    def __init__(self, path: str, steps: List[Step]):
+        self.path = path
+        self.steps = steps
+
+    def __repr__(self) -> str:
+        return f"Query({self.path!r})"
+
+    def _apply(self, step: Step, node: Any) -> Iterator[Any]:
+        # A repeated block is a list of dicts; walk into each of them
+        if isinstance(node, list):
+            for item in node:
+                if isinstance(item, dict):
+                    yield from self._apply(step, item)
+            return
+
+        if not isinstance(node, dict):
+            return
+
+        if step.name is None:
+            candidates = list(node.values())
+        elif step.name in node:
+            candidates = [node[step.name]]
+        else:
+            return
+
+        for value in candidates:
+            if step.index is None:
+                yield value
+            elif step.index == "*":
+                yield from _occurrences(value)
+            else:
+                occurrences = _occurrences(value)
+                if -len(occurrences) <= step.index < len(occurrences):
+                    yield occurrences[step.index]
+
+    def iter_match(self, tree: Dict[str, Any]) -> Iterator[Any]:
+        """Lazily yield every value the query selects from ``tree``"""
+        return self._walk(tree, 0)
+
+    def _walk(self, node: Any, depth: int) -> Iterator[Any]:
+        if depth == len(self.steps):
+            yield node
+            return
+        for value in self._apply(self.steps[depth], node):
+            yield from self._walk(value, depth + 1)
+
+    def match(self, tree: Dict[str, Any]) -> List[Any]:
+        """Every value the query selects from ``tree``, in document order"""
+        return list(self.iter_match(tree))
+
+    def first(self, tree: Dict[str, Any], default: Any = None) -> Any:
+        """The first value the query selects, or ``default``"""
+        return next(self.iter_match(tree), default)
+
+
+def compile_query(path: str) -> Query:
+    """
+    Compile a path such as ``server[*].location.proxy_pass``.
+
+    A name containing '.' has to be quoted (``upstream."v1.2".server``);
+    unquoted, the '.' separates two steps.
+    """
+    steps = []
+    pos = 0
+    while True:
+        match = _STEP_PATTERN.match(path, pos)
+        if match is None:
+            if path[pos : pos + 1] in ("'", '"'):
+                raise QueryError(pos + 1, "Unterminated quoted name")
+            segment = path[pos:].split(".", 1)[0]
+            raise QueryError(pos + 1, f"Invalid query segment: {segment!r}")
+
+        plain, double_quoted, single_quoted, index = match.groups()
+        if plain is not None:
+            name = None if plain == "*" else plain
+        else:
+            quoted = double_quoted if double_quoted is not None else single_quoted
+            name = _ESCAPE.sub(r"\1", quoted)
+        steps.append(
+            Step(name=name, index=index if index in (None, "*") else int(index))
+        )
+
+        pos = match.end()
+        if pos == len(path):
+            break
+        if path[pos] != ".":
+            raise QueryError(pos + 1, f"Expected '.' between steps, got {path[pos]!r}")
+        pos += 1
+
+    return Query(path, steps)
+
+
+class ProjectingParser(config.ConfigParser):
+    """
+    ConfigParser that only builds the parts of the tree a query can reach.
+
+    Directives whose names do not match the query at their depth are skipped
+    with a regex scan that stops exactly where ``ConfigParser`` would, so
+    nothing under them is decoded or built. Once a match reaches the end of
+    the query it is parsed in full.
+
+    Indices are not used for pruning: every occurrence of a matching name is
+    kept so that ``[N]`` selects the same occurrence as on the full tree.
+    """
+
+    def __init__(self, text: str, query: Union[str, Query]):
+        super().__init__(text)
+        self.query = compile_query(query) if isinstance(query, str) else query
+
+    def parse(self) -> Dict[str, Any]:
+        """Parse the configuration, keeping only what the query can reach"""
+        return self.parse_projected_block(0)
+
+    def parse_projected_block(self, depth: int) -> Dict[str, Any]:
+        """parse_block, pruned to the query step at ``depth``"""
+        if depth >= len(self.query.steps):
+            return self.parse_block()
+
+        step = self.query.steps[depth]
+        result = {}
+
+        while self.pos < self.length:
+            self.skip_whitespace()
+
+            if not self.peek() or self.peek() == "}":
+                break
+
+            directive = self.read_identifier()
+            if not directive:
+                break
+
+            wanted = step.matches(directive)
+            self.skip_whitespace()
+
+            if self.peek() == "{":
+                self.consume()  # consume '{'
+                if wanted:
+                    block_content = self.parse_projected_block(depth + 1)
+                else:
+                    self.skip_block()
+                self.skip_whitespace()
+                if self.peek() == "}":
+                    self.consume()  # consume '}'
+
+                if wanted:
+                    self.store_directive(result, directive, block_content)
+
+            elif wanted:
+                final_value = self.read_directive_value()
+                self.store_directive(result, directive, final_value)
+            else:
+                self.pos = _skip_directive_value(self.text, self.pos)
+
+        return result
+
+    def skip_block(self):
+        """Walk past a block exactly as parse_block would, building nothing"""
+        self.pos = _skip_block(self.text, self.pos)
+
+
+# Token patterns matching ConfigParser's skip_whitespace, read_identifier,
+# read_value and read_quoted_string. \s and \w use the same Unicode tables as
+# str.isspace() and str.isalnum(), so the skip functions below stop at exactly
+# the positions ConfigParser's character loops would, but let the regex
+# engine do the scanning.
+_skip_whitespace = re.compile(r"\s*").match
+_skip_identifier = re.compile(r"[\w\-./]*").match
+_skip_unquoted = re.compile(r"[^;{} \t\n\r]*").match
+_skip_quoted_body = {
+    '"': re.compile(r'(?:[^"\\]|\\.)*', re.DOTALL).match,
+    "'": re.compile(r"(?:[^'\\]|\\.)*", re.DOTALL).match,
+}
+
+
+def _skip_block(text: str, pos: int) -> int:
+    """ConfigParser.parse_block without building anything; returns the end"""
+    length = len(text)
+    while pos < length:
+        pos = _skip_whitespace(text, pos).end()
+        if pos >= length or text[pos] == "}":
+            break
+
+        end = _skip_identifier(text, pos).end()
+        if end == pos:
+            break
+
+        pos = _skip_whitespace(text, end).end()
+        if pos < length and text[pos] == "{":
+            pos = _skip_block(text, pos + 1)
+            pos = _skip_whitespace(text, pos).end()
+            if pos < length and text[pos] == "}":
+                pos += 1
+        else:
+            pos = _skip_directive_value(text, pos)
+    return pos
+
+
+def _skip_directive_value(text: str, pos: int) -> int:
+    """ConfigParser.read_directive_value without building the value"""
+    length = len(text)
+    pos, _ = _skip_value(text, pos)
+    while True:
+        pos = _skip_whitespace(text, pos).end()
+        if pos >= length or text[pos] in ";{}":
+            break
+        pos, non_empty = _skip_value(text, pos)
+        if not non_empty:
+            break
+
+    pos = _skip_whitespace(text, pos).end()
+    if pos < length and text[pos] == ";":
+        pos += 1
+    return pos
+
+
+def _skip_value(text: str, pos: int) -> Tuple[int, bool]:
+    """ConfigParser.read_value without building the value"""
+    pos = _skip_whitespace(text, pos).end()
+    if pos >= len(text):
+        return pos, False
+
+    char = text[pos]
+    if char in "\"'":
+        start = pos + 1
+        end = _skip_quoted_body[char](text, start).end()
+        # Every character or escape in the body decodes to one character
+        non_empty = end > start
+        if end < len(text):
+            # Either the closing quote, or a backslash escaping nothing at
+            # the very end of the input
+            end += 1
+        return end, non_empty
+
+    end = _skip_unquoted(text, pos).end()
+    return end, bool(text[pos:end].strip())
+
+
+SAMPLE_CONFIG = """
+server {
+    listen 80;
+    server_name example.com;
+    location {
+        path /api;
+        proxy_pass http://backend;
+    }
+    location {
+        path /static;
+        root /var/www;
+    }
+}
+
+server {
+    listen 443;
+    location {
+        path /;
+        proxy_pass http://secure-backend;
+    }
+}
+
+upstream {
+    server 192.168.1.1:8080;
+    server 192.168.1.2:8080;
+}
+"""
+
+
+def benchmark_projection(servers: int = 300, iterations: int = 5):
+    """Compare a full parse + query with a projected parse + query"""
+    filler = "".join(
+        f"""    upstream_check_{i} {{
+        proxy_set_header X-Forwarded-For "$proxy_add_x_forwarded_for";
+        proxy_pass http://backend-{i}.internal.example.com:8080/api/v1;
+        add_header Content-Security-Policy "default-src 'self'; img-src *";
+        access_log /var/log/nginx/access-{i}.log combined;
+    }}
+"""
+        for i in range(5)
+    )
+    server = (
+        "server {\n    listen 80;\n" + filler
+        + "    location {\n        proxy_pass http://backend;\n    }\n}\n"
+    )
+    text = server * servers
+    query = compile_query("server[*].location[*].proxy_pass")
+
+    start_time = time.perf_counter()
+    for _ in range(iterations):
+        full = query.match(config.ConfigParser(text).parse())
+    full_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    for _ in range(iterations):
+        projected = query.match(ProjectingParser(text, query).parse())
+    projected_time = time.perf_counter() - start_time
+
+    assert full == projected
+    print(f"\n=== PROJECTION ({len(text):,} chars, {len(full)} matches) ===")
+    print(f"Full parse then query:   {full_time / iterations * 1000:8.2f} ms")
+    print(f"Projected parse + query: {projected_time / iterations * 1000:8.2f} ms")
+    print(f"Projection is {full_time / projected_time:.2f}x faster")
+
+
+def main():
+    tree = config.ConfigParser(SAMPLE_CONFIG).parse()
+
+    print("=== QUERIES ===")
+    for path in [
+        "server.listen",
+        "server[*].location[*].proxy_pass",
+        "server[1].location.path",
+        "upstream.server[*]",
+        "upstream.server[-1]",
+        "*.listen",
+    ]:
+        print(f"{path:<36} {compile_query(path).match(tree)}")
+
+    try:
+        compile_query("server..listen")
+    except QueryError as e:
+        print(f"\nInvalid query: {e}")
+
+    benchmark_projection()
+
+
+if __name__ == "__main__":
+    main()
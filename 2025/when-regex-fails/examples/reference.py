@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Reference Implementations
+=========================
+
+Verbatim copies of the original, unoptimised ``parse_config`` (from
+``benchmark.py``) and ``ConfigParser`` (from ``config.py``). They are kept so
+that faster versions elsewhere in ``examples/`` can be checked against (and
+timed against) the code they replaced; see ``fuzz.py``.
+
+Do not optimise anything in this file.
+"""
+
+from typing import Any, Dict, List, NamedTuple, Tuple, Union
+
+ConfigValue = Union[str, int, float, bool, List[str]]
+
+
+# ----------------------------------------------------------------------------
+# Section based parser (benchmark.py)
+# ----------------------------------------------------------------------------
+
+class ParseState(NamedTuple):
+    """Immutable state for parsing operations"""
+    lines: List[str]
+    line_number: int
+    result: Dict[str, Any]
+
+class ParseError(Exception):
+    def __init__(self, line_number: int, message: str):
+        self.line_number = line_number
+        self.message = message
+        super().__init__(f"Line {line_number}: {message}")
+
+def parse_config(text: str) -> Dict[str, Any]:
+    """Parse configuration text into a nested dictionary using functional approach."""
+    lines = [line.strip() for line in text.strip().split('\n')]
+    initial_state = ParseState(lines=lines, line_number=0, result={})
+
+    final_state = parse_lines(initial_state)
+    return final_state.result
+
+def parse_lines(state: ParseState) -> ParseState:
+    """Recursively parse all lines in the configuration."""
+    if state.line_number >= len(state.lines):
+        return state
+
+    line = state.lines[state.line_number]
+
+    # Skip empty lines and comments
+    if not line or line.startswith('#'):
+        return parse_lines(advance_line(state))
+
+    # Handle section headers
+    if line.startswith('[') and line.endswith(']'):
+        return parse_lines(parse_section(state))
+
+    # Handle root-level key-value pairs
+    key, value = parse_key_value_line(line, state.line_number)
+    new_result = {**state.result, key: value}
+    new_state = ParseState(state.lines, state.line_number + 1, new_result)
+
+    return parse_lines(new_state)
+
+def parse_section(state: ParseState) -> ParseState:
+    """Parse a section header and its contents."""
+    line = state.lines[state.line_number]
+
+    if not (line.startswith('[') and line.endswith(']')):
+        raise ParseError(state.line_number + 1, f"Invalid section header: {line}")
+
+    section_path = line[1:-1].strip()
+    section_state = advance_line(state)
+
+    # Parse section contents
+    section_content, final_state = parse_section_contents(section_state)
+
+    # Merge section into result
+    new_result = set_nested_dict(state.result, section_path.split('.'), section_content)
+
+    return ParseState(final_state.lines, final_state.line_number, new_result)
+
+def parse_section_contents(state: ParseState) -> Tuple[Dict[str, Any], ParseState]:
+    """Parse the contents of a section until the next section or end of file."""
+    section_dict = {}
+    current_state = state
+
+    while current_state.line_number < len(current_state.lines):
+        line = current_state.lines[current_state.line_number]
+
+        # Stop at next section
+        if line.startswith('['):
+            break
+
+        # Skip empty lines and comments
+        if not line or line.startswith('#'):
+            current_state = advance_line(current_state)
+            continue
+
+        # Parse key-value pair
+        key, value = parse_key_value_line(line, current_state.line_number)
+        section_dict = {**section_dict, key: value}
+        current_state = advance_line(current_state)
+
+    return section_dict, current_state
+
+def parse_key_value_line(line: str, line_number: int) -> Tuple[str, ConfigValue]:
+    """Parse a key-value line into key and properly typed value."""
+    if '=' not in line:
+        raise ParseError(line_number + 1, f"Invalid key-value pair: {line}")
+
+    key, value_str = line.split('=', 1)
+    key = key.strip()
+    value_str = value_str.strip()
+
+    if not key:
+        raise ParseError(line_number + 1, "Empty key name")
+
+    return key, parse_value(value_str)
+
+def parse_value(value_str: str) -> ConfigValue:
+    """Parse a value string into the appropriate Python type."""
+    value_str = value_str.strip()
+
+    # Handle quoted strings
+    if is_quoted_string(value_str):
+        return value_str[1:-1]  # Remove quotes
+
+    # Handle arrays
+    if is_array(value_str):
+        return parse_array(value_str)
+
+    # Handle booleans
+    if value_str.lower() in ('true', 'false'):
+        return value_str.lower() == 'true'
+
+    # Handle numbers
+    number_value = try_parse_number(value_str)
+    if number_value is not None:
+        return number_value
+
+    # Default to string
+    return value_str
+
+def is_quoted_string(value_str: str) -> bool:
+    """Check if value is a quoted string."""
+    return ((value_str.startswith('"') and value_str.endswith('"')) or
+            (value_str.startswith("'") and value_str.endswith("'")))
+
+def is_array(value_str: str) -> bool:
+    """Check if value is an array."""
+    return value_str.startswith('[') and value_str.endswith(']')
+
+def parse_array(value_str: str) -> List[str]:
+    """Parse array value into list of strings."""
+    array_content = value_str[1:-1].strip()
+    if not array_content:
+        return []
+
+    elements = []
+    for element in array_content.split(','):
+        element = element.strip()
+        if is_quoted_string(element):
+            elements.append(element[1:-1])
+        else:
+            elements.append(element)
+    return elements
+
+def try_parse_number(value_str: str) -> Union[int, float, None]:
+    """Try to parse string as number, return None if not a number."""
+    try:
+        if '.' in value_str:
+            return float(value_str)
+        else:
+            return int(value_str)
+    except ValueError:
+        return None
+
+def set_nested_dict(d: Dict[str, Any], path: List[str], value: Any) -> Dict[str, Any]:
+    """Immutably set a value in a nested dictionary structure."""
+    if len(path) == 1:
+        return {**d, path[0]: value}
+
+    key = path[0]
+    remaining_path = path[1:]
+    current_nested = d.get(key, {})
+
+    return {**d, key: set_nested_dict(current_nested, remaining_path, value)}
+
+def advance_line(state: ParseState) -> ParseState:
+    """Create new state with line number advanced by 1."""
+    return ParseState(state.lines, state.line_number + 1, state.result)
+
+
+# ----------------------------------------------------------------------------
+# Brace-delimited parser (config.py)
+# ----------------------------------------------------------------------------
+
+class ConfigParser:
+    """
+    Proper parser for configuration files.
+    Handles nested structures, quoted strings, and maintains context.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.pos = 0
+        self.length = len(text)
+
+    def peek(self) -> str:
+        """Look at current character without consuming it"""
+        return self.text[self.pos] if self.pos < self.length else ""
+
+    def consume(self) -> str:
+        """Consume and return current character"""
+        if self.pos >= self.length:
+            return ""
+        char = self.text[self.pos]
+        self.pos += 1
+        return char
+
+    def skip_whitespace(self):
+        """Skip whitespace and newlines"""
+        while self.pos < self.length and self.text[self.pos].isspace():
+            self.pos += 1
+
+    def read_identifier(self) -> str:
+        """Read an identifier (letters, numbers, underscore, hyphen, dot, slash)"""
+        start = self.pos
+        while self.pos < self.length and (
+            self.text[self.pos].isalnum() or self.text[self.pos] in "_-./"
+        ):
+            self.pos += 1
+        return self.text[start : self.pos]
+
+    def read_quoted_string(self) -> str:
+        """Read a quoted string, properly handling escapes"""
+        quote_char = self.consume()  # consume opening quote
+        result = ""
+
+        while self.pos < self.length:
+            char = self.peek()
+            if char == quote_char:
+                self.consume()  # consume closing quote
+                break
+            elif char == "\\":
+                self.consume()  # consume backslash
+                escaped = self.consume()
+                # Handle common escape sequences
+                if escaped == "n":
+                    result += "\n"
+                elif escaped == "t":
+                    result += "\t"
+                elif escaped == "r":
+                    result += "\r"
+                elif escaped == "\\":
+                    result += "\\"
+                else:
+                    result += escaped
+            else:
+                result += self.consume()
+
+        return result
+
+    def read_value(self) -> str:
+        """Read a value (quoted string or unquoted token)"""
+        self.skip_whitespace()
+
+        if self.peek() in "\"'":
+            return self.read_quoted_string()
+        else:
+            # Read until semicolon, brace, or whitespace
+            start = self.pos
+            while self.pos < self.length and self.text[self.pos] not in ";{} \t\n\r":
+                self.pos += 1
+            return self.text[start : self.pos].strip()
+
+    def parse_block(self) -> Dict[str, Any]:
+        """Parse a configuration block recursively"""
+        result = {}
+
+        while self.pos < self.length:
+            self.skip_whitespace()
+
+            # Check for end of block or end of file
+            if not self.peek() or self.peek() == "}":
+                break
+
+            # Read directive name
+            directive = self.read_identifier()
+            if not directive:
+                break
+
+            self.skip_whitespace()
+
+            if self.peek() == "{":
+                # It's a block directive
+                self.consume()  # consume '{'
+                block_content = self.parse_block()
+                self.skip_whitespace()
+                if self.peek() == "}":
+                    self.consume()  # consume '}'
+
+                # Handle multiple blocks with same name
+                if directive in result:
+                    if isinstance(result[directive], list):
+                        result[directive].append(block_content)
+                    else:
+                        result[directive] = [result[directive], block_content]
+                else:
+                    result[directive] = block_content
+
+            else:
+                # It's a value directive - may have multiple values
+                values = []
+
+                # Read first value
+                value = self.read_value()
+                if value:
+                    values.append(value)
+
+                # Check for additional values (space-separated)
+                while True:
+                    self.skip_whitespace()
+                    if self.peek() in ";{}" or not self.peek():
+                        break
+
+                    additional_value = self.read_value()
+                    if additional_value:
+                        values.append(additional_value)
+                    else:
+                        break
+
+                self.skip_whitespace()
+
+                # Consume semicolon if present
+                if self.peek() == ";":
+                    self.consume()
+
+                # Store the values
+                final_value = (
+                    " ".join(values)
+                    if len(values) > 1
+                    else (values[0] if values else "")
+                )
+
+                # Handle multiple directives with same name
+                if directive in result:
+                    if isinstance(result[directive], list):
+                        result[directive].append(final_value)
+                    else:
+                        result[directive] = [result[directive], final_value]
+                else:
+                    result[directive] = final_value
+
+        return result
+
+    def parse(self) -> Dict[str, Any]:
+        """Parse the entire configuration"""
+        return self.parse_block()
@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+Watch-and-Reload Service
+========================
+
+A long running loader for a directory of config files. Instead of polling
+every file and re-running ``parse_config`` / ``ConfigParser`` on all of them
+whenever something *might* have changed, the watcher:
+
+1. Learns which files changed, from inotify on Linux or by comparing
+   ``stat()`` signatures everywhere else
+2. Debounces bursts of writes (editors and deploy tools often write a file
+   several times in a row) into a single reload, waiting at most
+   ``max_delay`` seconds for a file that never stops changing
+3. Re-parses only the changed files, in a worker pool
+4. Atomically swaps in a new immutable snapshot of the parsed tree
+
+Readers just take ``watcher.snapshot``; they never lock and never see a half
+applied reload. Reloads themselves are serialised, so a manual ``reload()``
+and the background thread cannot overwrite each other's changes. The cost
+of a reload is proportional to the number of *changed* files, not the size
+of the directory.
+
+Usage:
+
+    with ConfigWatcher("/etc/myapp") as watcher:
+        servers = watcher.snapshot.configs["nginx.conf"]["server"]
+
+The directory is watched non-recursively. Files are matched to a parser by
+suffix (see ``DEFAULT_PARSERS``).
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import Executor, ThreadPoolExecutor
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, Mapping, NamedTuple, Optional, Set, Tuple
+
+import benchmark
+import config
+
+
+def parse_block_config(text: str) -> Dict[str, Any]:
+    """Parse brace-delimited (nginx style) config text"""
+    return config.ConfigParser(text).parse()
+
+
+def parse_section_config(text: str) -> Dict[str, Any]:
+    """Parse section based (INI style) config text"""
+    return benchmark.parse_config(text)
+
+
+DEFAULT_PARSERS: Dict[str, Callable[[str], Dict[str, Any]]] = {
+    ".conf": parse_block_config,
+    ".ini": parse_section_config,
+    ".cfg": parse_section_config,
+}
+
+
+class ConfigSnapshot(NamedTuple):
+    """An immutable, consistent view of every parsed file"""
+
+    version: int
+    configs: Mapping[str, Dict[str, Any]]  # file name -> parsed tree
+    errors: Mapping[str, str]  # file name -> last parse error
+
+
+def load_file(path: str, parser: Callable[[str], Dict[str, Any]]) -> Dict[str, Any]:
+    """Read and parse a single file (runs inside the worker pool)"""
+    with open(path, encoding="utf-8") as handle:
+        return parser(handle.read())
+
+
+class StatPoller:
+    """
+    Change source that compares ``stat()`` signatures on every scan.
+    Works everywhere, at the cost of one ``stat()`` per file per interval.
+    """
+
+    def __init__(self, directory: str, interval: float = 1.0):
+        self.directory = directory
+        self.interval = interval
+        self._signatures = self._scan()
+        self._closed = threading.Event()
+
+    def _scan(self) -> Dict[str, Tuple[int, int, int]]:
+        signatures = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                try:
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                signatures[entry.name] = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        return signatures
+
+    def wait(self, timeout: float) -> Set[str]:
+        """Block for up to ``timeout`` seconds, then return changed file names"""
+        if self._closed.wait(min(timeout, self.interval)):
+            return set()
+
+        current = self._scan()
+        previous = self._signatures
+        self._signatures = current
+
+        changed = {name for name, sig in current.items() if previous.get(name) != sig}
+        changed.update(name for name in previous if name not in current)
+        return changed
+
+    def wake(self):
+        """Make a blocked ``wait()`` return straight away"""
+        self._closed.set()
+
+    def close(self):
+        self._closed.set()
+
+
+class InotifyWatcher:
+    """Change source backed by Linux inotify, read through ctypes"""
+
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_Q_OVERFLOW = 0x00004000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+
+    MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+    _EVENT = struct.Struct("iIII")  # wd, mask, cookie, name length
+
+    def __init__(self, directory: str):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        watch = libc.inotify_add_watch(self._fd, os.fsencode(directory), self.MASK)
+        if watch < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, f"inotify_add_watch failed for {directory}")
+
+        # A pipe lets wake() interrupt a blocked select() immediately
+        self._wake_read, self._wake_write = os.pipe()
+
+    @classmethod
+    def available(cls) -> bool:
+        return sys.platform.startswith("linux")
+
+    def wait(self, timeout: float) -> Optional[Set[str]]:
+        """
+        Block for up to ``timeout`` seconds, then return changed file names.
+        Returns None if the kernel queue overflowed and events were dropped,
+        in which case any file may have changed.
+        """
+        readable, _, _ = select.select([self._fd, self._wake_read], [], [], timeout)
+        if self._fd not in readable:
+            return set()
+
+        changed = set()
+        overflowed = False
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                _, mask, _, length = self._EVENT.unpack_from(data, offset)
+                offset += self._EVENT.size
+                name = data[offset : offset + length].rstrip(b"\0")
+                offset += length
+                if mask & self.IN_Q_OVERFLOW:
+                    overflowed = True
+                elif name:
+                    changed.add(os.fsdecode(name))
+        return None if overflowed else changed
+
+    def wake(self):
+        """Make a blocked ``wait()`` return straight away"""
+        os.write(self._wake_write, b"\0")
+
+    def close(self):
+        """Release the inotify descriptor; only once nothing is waiting"""
+        for fd in (self._fd, self._wake_read, self._wake_write):
+            os.close(fd)
+
+
+class ConfigWatcher:
+    """
+    Keep an always-current parsed view of a config directory.
+
+    ``snapshot`` is replaced wholesale on every reload, so reading it is a
+    single attribute lookup and a reader holding on to a snapshot keeps a
+    consistent view for as long as it likes. Files that fail to parse keep
+    their previous tree; the error is recorded in ``snapshot.errors``.
+    Anything else that goes wrong in the background thread, including an
+    exception from ``on_reload``, is passed to ``on_error`` (or printed) and
+    the watcher keeps running.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        parsers: Optional[Dict[str, Callable[[str], Dict[str, Any]]]] = None,
+        debounce: float = 0.2,
+        max_delay: float = 2.0,
+        poll_interval: float = 1.0,
+        workers: int = 4,
+        executor: Optional[Executor] = None,
+        use_inotify: bool = True,
+        on_reload: Optional[Callable[[ConfigSnapshot, Set[str]], None]] = None,
+        on_error: Optional[Callable[[Exception], None]] = None,
+    ):
+        self.directory = directory
+        self.parsers = parsers if parsers is not None else DEFAULT_PARSERS
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.on_reload = on_reload
+        self.on_error = on_error
+
+        # A ProcessPoolExecutor gives truly parallel parsing, as long as the
+        # parser functions can be pickled (the defaults can)
+        self._owns_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=workers)
+        self._use_inotify = use_inotify
+        self._source = None
+        self._thread = None
+        self._stopping = threading.Event()
+        # Only writers take the lock; readers just load self._snapshot
+        self._reload_lock = threading.Lock()
+        self._snapshot = ConfigSnapshot(0, MappingProxyType({}), MappingProxyType({}))
+
+    @property
+    def snapshot(self) -> ConfigSnapshot:
+        """The current parsed tree; safe to read from any thread"""
+        return self._snapshot
+
+    def _parser_for(self, name: str) -> Optional[Callable[[str], Dict[str, Any]]]:
+        return self.parsers.get(os.path.splitext(name)[1])
+
+    def _open_source(self):
+        if self._use_inotify and InotifyWatcher.available():
+            try:
+                return InotifyWatcher(self.directory)
+            except OSError:
+                pass
+        return StatPoller(self.directory, self.poll_interval)
+
+    def start(self) -> "ConfigWatcher":
+        """Load every matching file, then watch for changes in the background"""
+        # Open the change source first so writes during the initial load are
+        # not missed
+        self._source = self._open_source()
+        self.reload(os.listdir(self.directory))
+
+        self._thread = threading.Thread(
+            target=self._run, name="config-watcher", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop watching and release the worker pool"""
+        self._stopping.set()
+        if self._source is not None:
+            self._source.wake()
+        if self._thread is not None:
+            self._thread.join()
+        if self._source is not None:
+            self._source.close()
+        if self._owns_executor:
+            self._executor.shutdown()
+
+    def __enter__(self) -> "ConfigWatcher":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _report_error(self, error: Exception):
+        """Hand a background error to ``on_error``, or print it to stderr"""
+        if self.on_error is not None:
+            try:
+                self.on_error(error)
+                return
+            except Exception:
+                pass
+        traceback.print_exception(type(error), error, error.__traceback__)
+
+    def _known_names(self) -> Set[str]:
+        """Every file name that is, or should be, in the snapshot"""
+        snapshot = self._snapshot
+        names = set(snapshot.configs) | set(snapshot.errors)
+        names.update(os.listdir(self.directory))
+        return names
+
+    def _run(self):
+        """Background loop: gather changes, debounce, reload"""
+        pending: Set[str] = set()
+        deadline = None
+        latest = None  # reload no later than this, however busy the files are
+
+        while not self._stopping.is_set():
+            try:
+                if deadline is None:
+                    timeout = self.poll_interval
+                else:
+                    timeout = max(0.0, deadline - time.monotonic())
+
+                changed = self._source.wait(timeout)
+                if self._stopping.is_set():
+                    break
+
+                if changed is None:
+                    # Events were lost; anything in the directory may differ
+                    changed = self._known_names()
+
+                now = time.monotonic()
+                if changed:
+                    pending |= changed
+                    if latest is None:
+                        latest = now + self.max_delay
+                    deadline = min(now + self.debounce, latest)
+                elif pending and now >= deadline:
+                    names, pending = pending, set()
+                    deadline = latest = None
+                    self.reload(names)
+            except Exception as e:
+                # A failing callback or a directory that briefly vanished must
+                # not stop the watcher; report it and carry on
+                self._report_error(e)
+
+    def reload(self, names: Iterable[str]) -> ConfigSnapshot:
+        """Re-parse the given file names and swap in a new snapshot"""
+        with self._reload_lock:
+            snapshot, changed = self._reload_locked(names)
+
+        if changed and self.on_reload is not None:
+            self.on_reload(snapshot, changed)
+        return snapshot
+
+    def _reload_locked(self, names: Iterable[str]) -> Tuple[ConfigSnapshot, Set[str]]:
+        jobs = {}
+        removed = set()
+        for name in names:
+            parser = self._parser_for(name)
+            if parser is None:
+                continue
+            path = os.path.join(self.directory, name)
+            if os.path.isfile(path):
+                jobs[name] = self._executor.submit(load_file, path, parser)
+            else:
+                removed.add(name)
+
+        if not jobs and not removed:
+            return self._snapshot, set()
+
+        current = self._snapshot
+        configs = dict(current.configs)
+        errors = dict(current.errors)
+
+        for name in removed:
+            configs.pop(name, None)
+            errors.pop(name, None)
+
+        for name, future in jobs.items():
+            try:
+                configs[name] = future.result()
+                errors.pop(name, None)
+            except FileNotFoundError:
+                # Deleted between the change event and the read
+                configs.pop(name, None)
+                errors.pop(name, None)
+            except Exception as e:
+                errors[name] = f"{type(e).__name__}: {e}"
+
+        snapshot = ConfigSnapshot(
+            current.version + 1,
+            MappingProxyType(configs),
+            MappingProxyType(errors),
+        )
+        # A single reference assignment: readers see the old or the new
+        # snapshot, never a mixture
+        self._snapshot = snapshot
+        return snapshot, set(jobs) | removed
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    arg_parser.add_argument("directory", help="config directory to watch")
+    arg_parser.add_argument(
+        "--debounce", type=float, default=0.2, help="seconds of quiet before reloading"
+    )
+    arg_parser.add_argument(
+        "--max-delay",
+        type=float,
+        default=2.0,
+        help="longest wait for a reload while a file keeps changing",
+    )
+    arg_parser.add_argument(
+        "--poll", action="store_true", help="force stat polling instead of inotify"
+    )
+    args = arg_parser.parse_args()
+
+    def report(snapshot: ConfigSnapshot, changed: Set[str]):
+        print(f"v{snapshot.version}: reloaded {', '.join(sorted(changed))}")
+        for name, error in sorted(snapshot.errors.items()):
+            print(f"  ✗ {name}: {error}")
+
+    watcher = ConfigWatcher(
+        args.directory,
+        debounce=args.debounce,
+        max_delay=args.max_delay,
+        use_inotify=not args.poll,
+        on_reload=report,
+    )
+    with watcher:
+        print(f"Watching {args.directory} with {type(watcher._source).__name__}")
+        print(f"Loaded {len(watcher.snapshot.configs)} files, Ctrl-C to stop")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()